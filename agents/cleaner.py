@@ -1,14 +1,15 @@
 #!/usr/bin/env python3
 """
-cleaner.py - simple dedupe + quality filter
+cleaner.py - simple dedupe + quality filter (single pass)
 Reads: data/crawler_items.json
 Writes: data/cleaned_items.json
 """
 
-import json
 from pathlib import Path
 from datetime import datetime
 
+import fastjson
+
 ROOT = Path.cwd()
 DATA = ROOT / "data"
 INP = DATA / "crawler_items.json"
@@ -18,35 +19,31 @@ MIN_SNIPPET = 40
 
 def load_items():
     try:
-        data = json.loads(INP.read_text(encoding="utf-8"))
+        data = fastjson.read(INP)
         return data.get("items", [])
     except Exception:
         return []
 
-def dedupe(items):
+def clean(items, ts):
+    """Dedupe by URL, drop short snippets and stamp cleaned_at in one pass."""
     seen = set()
     out = []
     for it in items:
-        url = (it.get("url") or "").split("#")[0].lower()
-        if not url:
-            continue
-        if url in seen:
+        url = (it.get("url") or "").split("#", 1)[0].lower()
+        if not url or url in seen:
             continue
+        # mark seen before the length check: first occurrence wins, as with dedupe-then-filter
         seen.add(url)
+        if len(it.get("snippet") or "") < MIN_SNIPPET:
+            continue
+        it.setdefault("cleaned_at", ts)
         out.append(it)
     return out
 
-def quality_filter(items):
-    return [i for i in items if len((i.get("snippet") or "")) >= MIN_SNIPPET]
-
 def main():
-    items = load_items()
-    items = dedupe(items)
-    items = quality_filter(items)
     ts = datetime.utcnow().isoformat()+"Z"
-    for it in items:
-        it.setdefault("cleaned_at", ts)
-    OUT.write_text(json.dumps({"generated_at": ts, "items": items}, indent=2), encoding="utf-8")
+    items = clean(load_items(), ts)
+    fastjson.write(OUT, {"generated_at": ts, "items": items})
     print("cleaner: wrote", OUT)
 
 if __name__ == "__main__":
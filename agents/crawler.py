@@ -1,18 +1,24 @@
 #!/usr/bin/env python3
 from pathlib import Path
-import os, time, json, hashlib, sys
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+import os, time, hashlib, sys, threading
 try:
     import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
 except Exception as e:
     print("[CRAWLER] Missing dependency requests:", e)
     raise
 
 try:
-    from bs4 import BeautifulSoup
+    from selectolax.lexbor import LexborHTMLParser
 except Exception as e:
-    print("[CRAWLER] Missing dependency bs4. Install with: pip install beautifulsoup4")
+    print("[CRAWLER] Missing dependency selectolax (lexbor backend). Install with: pip install 'selectolax>=0.3.17'")
     raise
 
+import fastjson
+
 ROOT = Path.cwd()
 DATA = ROOT / "data"
 NODES = DATA / "nodes"
@@ -26,13 +32,33 @@ for p in (DATA, NODES, LOGS, RULES, CACHE):
 
 LOG = LOGS / "crawler.log"
 USER_AGENT = os.environ.get("CRAWLER_UA","SEKGS-Crawler/1.0")
+# total concurrent fetches, and how many of those may hit the same host
+CONCURRENCY = int(os.environ.get("CRAWLER_CONCURRENCY", "8"))
+PER_HOST = int(os.environ.get("CRAWLER_PER_HOST", "2"))
+MAX_RETRIES = 3
+BACKOFF_BASE = 1.5
+TIMEOUT = 12
+
+_log_lock = threading.Lock()
+_host_locks = {}
+_host_locks_guard = threading.Lock()
 
 def log(msg):
     ts = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
     line = f"{ts} {msg}"
-    print(line)
-    with open(LOG, "a", encoding="utf-8") as f:
-        f.write(line + "\n")
+    with _log_lock:
+        print(line)
+        with open(LOG, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+def host_slot(url):
+    """Semaphore bounding parallel requests to the host of url."""
+    host = urlparse(url).netloc.lower()
+    with _host_locks_guard:
+        sem = _host_locks.get(host)
+        if sem is None:
+            sem = _host_locks[host] = threading.BoundedSemaphore(PER_HOST)
+        return sem
 
 def safe_id(url):
     return url.replace("https://","").replace("http://","").replace("/","_").replace(" ","_")
@@ -41,7 +67,7 @@ def save_node(url, text, partial=False):
     nid = safe_id(url)
     path = NODES / f"{nid}.json"
     payload = {"id": nid, "url": url, "partial": bool(partial), "text": text[:20000]}
-    path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+    fastjson.write(path, payload)
     log(f"[CRAWLER] saved node {path.name} partial={partial}")
 
 def load_seeds():
@@ -52,45 +78,98 @@ def load_seeds():
 
 def extract_text(html):
     try:
-        soup = BeautifulSoup(html, "html.parser")
-        for tag in soup(["script","style","noscript","header","footer","svg"]):
-            tag.decompose()
-        txt = soup.get_text(" ")
+        tree = LexborHTMLParser(html)
+        tree.strip_tags(["script","style","noscript","header","footer","svg"])
+        if tree.root is None:
+            return ""
+        # root rather than body so the <title> stays at the front of the text
+        txt = tree.root.text(separator=" ")
         txt = " ".join(txt.split())
         return txt
     except Exception as e:
         log("[CRAWLER] extract error: " + str(e))
         return ""
 
-def fetch(url, retries=3, timeout=12):
-    headers = {"User-Agent": USER_AGENT}
-    attempt = 0
-    while attempt < retries:
-        attempt += 1
-        try:
-            log(f"[CRAWLER] GET {url} attempt={attempt}")
-            r = requests.get(url, timeout=timeout, headers=headers)
-            r.raise_for_status()
-            return r.text
-        except Exception as e:
-            log(f"[CRAWLER] fetch error: {e}")
-            time.sleep(1.5 ** attempt)
-    return None
+def make_session():
+    """One keep-alive session for the whole run; urllib3 handles retry/backoff."""
+    session = requests.Session()
+    session.headers.update({"User-Agent": USER_AGENT})
+    retry = Retry(total=MAX_RETRIES, backoff_factor=BACKOFF_BASE,
+                  status_forcelist=[429, 500, 502, 503, 504])
+    # one pool per host, each big enough for every worker allowed on that host
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=min(PER_HOST, CONCURRENCY),
+                          pool_block=True, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+SESSION = make_session()
+
+def cache_key(url):
+    # naming only, not security: blake2b is fast and in stdlib
+    return hashlib.blake2b(url.encode("utf-8"), digest_size=16).hexdigest()
+
+def read_cache(url):
+    """Return (html, validators) cached for url, or (None, {})."""
+    key = cache_key(url)
+    try:
+        meta = fastjson.read(CACHE / f"{key}.meta")
+        html = (CACHE / f"{key}.html").read_text(encoding="utf-8")
+        return html, meta
+    except Exception:
+        return None, {}
+
+def write_cache(url, html, headers):
+    etag = headers.get("ETag")
+    last_modified = headers.get("Last-Modified")
+    if not etag and not last_modified:
+        return
+    key = cache_key(url)
+    try:
+        (CACHE / f"{key}.html").write_text(html, encoding="utf-8")
+        fastjson.write(CACHE / f"{key}.meta",
+                       {"url": url, "etag": etag, "last_modified": last_modified})
+    except Exception as e:
+        log(f"[CRAWLER] cache write error: {e}")
+
+def fetch(url, timeout=TIMEOUT):
+    try:
+        cached, meta = read_cache(url)
+        headers = {}
+        if cached is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+        log(f"[CRAWLER] GET {url}")
+        with host_slot(url):
+            r = SESSION.get(url, timeout=timeout, headers=headers)
+        if r.status_code == 304 and cached is not None:
+            log(f"[CRAWLER] not modified, using cache for {url}")
+            return cached
+        r.raise_for_status()
+        write_cache(url, r.text, r.headers)
+        return r.text
+    except Exception as e:
+        log(f"[CRAWLER] fetch error: {e}")
+        return None
 
 def main():
     seeds = load_seeds()
     if not seeds:
         log("[CRAWLER] No seeds found.")
         return
-    for url in seeds:
-        html = fetch(url)
+    # fetches overlap on the network; nodes are still saved in seed order
+    with ThreadPoolExecutor(max_workers=max(1, min(CONCURRENCY, len(seeds)))) as ex:
+        pages = list(ex.map(fetch, seeds))
+    for url, html in zip(seeds, pages):
         if html:
             txt = extract_text(html)
             partial = len(txt) < 50
             save_node(url, txt or "", partial=partial)
         else:
             save_node(url, "", partial=True)
-            log("[CRAWLER] All retries failed for " + url)
+            log("[CRAWLER] fetch failed for " + url)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+fastjson.py - small JSON helper shared by the agents
+
+- Uses orjson (C, bytes in / bytes out) when it is installed
+- Falls back to stdlib json when orjson is missing
+- write() serializes before opening the file, so a failure leaves the old
+  file intact, and writes bytes, so line endings are "\n" everywhere
+- Output is UTF-8 with non-ASCII characters kept as-is
+"""
+import json
+from pathlib import Path
+
+try:
+    import orjson
+except Exception:
+    orjson = None
+
+def loads(data):
+    """Parse JSON from bytes or str."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def dumps(obj) -> bytes:
+    """Serialize obj to UTF-8 bytes, 2-space indented."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+
+def read(path: Path):
+    """Load a JSON file without decoding it to a str first."""
+    return loads(Path(path).read_bytes())
+
+def write(path: Path, obj):
+    """Write obj as JSON to path; obj is fully serialized before the file is opened."""
+    Path(path).write_bytes(dumps(obj))
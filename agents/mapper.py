@@ -5,10 +5,14 @@ Reads: data/cleaned_items.json
 Writes: data/nodes/<slug>.json and updates data/graph.json
 """
 
-import json, re
+import string, time
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime
 
+import fastjson
+from textnorm import normalize_title
+
 ROOT = Path.cwd()
 DATA = ROOT / "data"
 NODES = DATA / "data_nodes_temp"  # temporary if nodes dir missing; will write to data/nodes below
@@ -18,53 +22,82 @@ GRAPH = DATA / "graph.json"
 NODES_DIR = DATA / "nodes"
 NODES_DIR.mkdir(parents=True, exist_ok=True)
 
+class _SlugTable(dict):
+    """str.translate table: keep [a-z0-9-], whitespace -> "-", drop the rest.
+
+    Non-ASCII code points are resolved on first sight and then cached.
+    """
+    def __missing__(self, cp):
+        v = "-" if chr(cp).isspace() else None
+        self[cp] = v
+        return v
+
+_SLUG_TABLE = _SlugTable({ord(c): c for c in string.ascii_lowercase + string.digits + "-"})
+
+@lru_cache(maxsize=8192)
 def slugify(text):
-    s = (text or "").lower()
-    s = re.sub(r"[^a-z0-9\s-]", "", s)
-    s = re.sub(r"\s+", "-", s.strip())
-    return s[:80] or "node-" + datetime.utcnow().strftime("%s")
+    s = normalize_title(text).translate(_SLUG_TABLE)
+    # collapse dash runs and trim leading/trailing dashes in one split/join
+    s = "-".join(filter(None, s.split("-")))
+    return s[:80] or "node-" + str(int(time.time()))
 
 def load_cleaned():
     try:
-        j = json.loads(CLEANED.read_text(encoding="utf-8"))
+        j = fastjson.read(CLEANED)
         return j.get("items", [])
     except Exception:
         return []
 
 def load_graph():
     try:
-        return json.loads(GRAPH.read_text(encoding="utf-8"))
+        return fastjson.read(GRAPH)
     except Exception:
         return {"meta": {"domain":"ai-tools-creator-workflows","version":"0.1"}, "nodes": [], "edges": []}
 
 def save_graph(g):
-    GRAPH.write_text(json.dumps(g, indent=2), encoding="utf-8")
+    fastjson.write(GRAPH, g)
 
 def write_node(node):
     path = NODES_DIR / f"{node['id']}.json"
-    path.write_text(json.dumps(node, indent=2), encoding="utf-8")
+    fastjson.write(path, node)
 
-def main():
-    items = load_cleaned()
-    graph = load_graph()
-    created = 0
+def build_nodes(items, now):
+    """One node per slug: the first item wins, duplicates add sources and raise trust."""
+    nodes = {}
     for i, it in enumerate(items):
         title = it.get("title") or it.get("url") or f"untitled-{i}"
         slug = slugify(title)
-        now = datetime.utcnow().isoformat()+"Z"
-        node = {
+        source = {"url": it.get("url",""), "fetched_at": it.get("fetched_at", now)}
+        node = nodes.get(slug)
+        if node is not None:
+            if all(s["url"] != source["url"] for s in node["sources"]):
+                node["sources"].append(source)
+            node["trust_score"] = max(node["trust_score"], it.get("trust_score", 50))
+            continue
+        nodes[slug] = {
             "id": slug,
             "title": title[:200],
             "summary": (it.get("snippet") or "")[:1000],
-            "sources": [{"url": it.get("url",""), "fetched_at": it.get("fetched_at", now)}],
+            "sources": [source],
             "created_at": now,
             "trust_score": it.get("trust_score", 50)
         }
+    return nodes
+
+def main():
+    items = load_cleaned()
+    graph = load_graph()
+    created = 0
+    now = datetime.utcnow().isoformat()+"Z"
+    graph_nodes = graph.setdefault("nodes", [])
+    known = set(graph_nodes)  # O(1) membership instead of scanning the list per item
+    for slug, node in build_nodes(items, now).items():
         write_node(node)
-        if slug not in graph.get("nodes", []):
-            graph.setdefault("nodes", []).append(slug)
+        if slug not in known:
+            known.add(slug)
+            graph_nodes.append(slug)
         created += 1
-    graph.setdefault("meta", {})["generated_at"] = datetime.utcnow().isoformat()+"Z"
+    graph.setdefault("meta", {})["generated_at"] = now
     save_graph(graph)
     print("mapper: created", created, "nodes and updated", GRAPH)
 
@@ -4,19 +4,20 @@ optimizer.py - simple graph optimizer (adds flag)
 Reads/Writes: data/graph.json
 """
 
-import json
 from pathlib import Path
 
+import fastjson
+
 ROOT = Path.cwd()
 GRAPH = ROOT / "data" / "graph.json"
 
 def main():
     try:
-        g = json.loads(GRAPH.read_text(encoding="utf-8"))
+        g = fastjson.read(GRAPH)
     except Exception:
         g = {"nodes": [], "edges": []}
     g.setdefault("meta", {})["optimized"] = True
-    GRAPH.write_text(json.dumps(g, indent=2), encoding="utf-8")
+    fastjson.write(GRAPH, g)
     print("optimizer: updated graph meta")
 
 if __name__ == "__main__":
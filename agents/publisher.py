@@ -10,10 +10,11 @@ Safe, minimal and robust publisher agent.
 """
 from pathlib import Path
 import os
-import json
 from datetime import datetime
 import traceback
 
+import fastjson
+
 ROOT = Path.cwd()
 DATA_DIR = ROOT / "data"
 REPORTS_DIR = ROOT / "reports"
@@ -37,19 +38,20 @@ def safe_load_json(path: Path):
         log(f"missing file {path}")
         return None
     try:
-        return json.loads(path.read_text(encoding="utf-8"))
+        return fastjson.read(path)
     except Exception as e:
         log(f"json load failed {e}")
         return None
 
-def build_markdown_report(graph: dict):
+def build_markdown_report(graph: dict, now: datetime = None):
     # simple and robust no-fancy-comprehensions
+    now = now or datetime.utcnow()
     meta = graph.get("meta", {})
     nodes = graph.get("nodes", [])
     edges = graph.get("edges", [])
 
     lines = []
-    lines.append(f"# SEKGS Daily — {datetime.utcnow().strftime('%Y-%m-%d (UTC)')}")
+    lines.append(f"# SEKGS Daily — {now.strftime('%Y-%m-%d (UTC)')}")
     lines.append("")
     lines.append(f"Nodes: {len(nodes)}  Edges: {len(edges)}")
     lines.append("")
@@ -93,11 +95,13 @@ def build_markdown_report(graph: dict):
 
     return "\n".join(lines)
 
-def write_report(md_text: str):
-    filename = f"daily-{datetime.utcnow().strftime('%Y-%m-%d')}.md"
+def write_report(md_text: str, now: datetime = None):
+    now = now or datetime.utcnow()
+    filename = f"daily-{now.strftime('%Y-%m-%d')}.md"
     path = REPORTS_DIR / filename
     try:
-        path.write_text(md_text, encoding="utf-8")
+        # single write of the joined report; pin LF so output matches across OSes
+        path.write_text(md_text, encoding="utf-8", newline="\n")
         log(f"wrote report: {path}")
         return path
     except Exception as e:
@@ -139,8 +143,10 @@ def main():
             log("graph missing or invalid - aborting publisher")
             return 1
 
-        md = build_markdown_report(graph)
-        report_path = write_report(md)
+        # one clock read so the heading date and the file name always agree
+        now = datetime.utcnow()
+        md = build_markdown_report(graph, now)
+        report_path = write_report(md, now)
         # always try Notion but failure shouldn't crash pipeline
         maybe_post_to_notion(md)
         log("publisher finished OK")
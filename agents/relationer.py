@@ -2,25 +2,37 @@
 """
 Robust relationer for SEKGS.
 
-- No external dependencies (only Python stdlib).
+- No required external dependencies (stdlib; JSON goes through fastjson,
+  which uses orjson only when it is installed).
 - Deterministic, idempotent, atomic writes.
-- Uses difflib.SequenceMatcher for a stable text similarity metric.
+- Uses difflib.SequenceMatcher for a stable text similarity metric, or
+  TF-IDF cosine / token Jaccard (RELATIONS_METHOD=tfidf|jaccard) for
+  large corpora.
 - Safeguards:
   * skips relation stage if <2 nodes
   * writes partial graph if anything fails
+  * exits 2 without touching graph.json on an unknown RELATIONS_METHOD
   * computes top-k relations per node with dedupe
   * writes checksums and timestamps in meta
   * logs to data/logs/relationer.log
 - Configurable with environment variables:
   RELATIONS_TOP_K (default 3)
   RELATIONS_MIN_SIM (default 0.05)
+  RELATIONS_METHOD (default sequence; or tfidf, jaccard)
+  RELATIONS_WORKERS (default: CPU count; processes for the sequence method)
+  RELATIONS_MAX_CHARS (default 4096; text prefix compared by the sequence method, 0 = all)
   DATA_DIR (default ./data)
 """
 from pathlib import Path
-import json, os, time, traceback, hashlib
+import os, time, traceback, hashlib, heapq, math, re
+from array import array
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from difflib import SequenceMatcher
 from typing import List, Tuple
 
+import fastjson
+
 # ---------- config ----------
 DATA_DIR = Path(os.environ.get("DATA_DIR", "data"))
 NODES_DIR = DATA_DIR / "nodes"
@@ -32,6 +44,15 @@ LOG_FILE = LOG_DIR / "relationer.log"
 
 RELATIONS_TOP_K = int(os.environ.get("RELATIONS_TOP_K", "3"))
 RELATIONS_MIN_SIM = float(os.environ.get("RELATIONS_MIN_SIM", "0.05"))
+# "sequence": difflib ratio over every pair; "tfidf"/"jaccard": sparse, only pairs sharing a term
+RELATIONS_METHOD = os.environ.get("RELATIONS_METHOD", "sequence").strip().lower()
+# SequenceMatcher cost grows ~quadratically with length; compare only this prefix
+RELATIONS_MAX_CHARS = int(os.environ.get("RELATIONS_MAX_CHARS", "4096"))
+# processes used by the sequence method; small corpora stay single-process
+RELATIONS_WORKERS = int(os.environ.get("RELATIONS_WORKERS", str(os.cpu_count() or 1)))
+PARALLEL_MIN_NODES = 64
+# threads used to read node files; reads are I/O bound so this overlaps syscalls
+READ_WORKERS = 16
 # ---------- end config ----------
 
 def log(msg: str):
@@ -47,8 +68,7 @@ def log(msg: str):
 
 def safe_read_json(path: Path):
     try:
-        s = path.read_text(encoding="utf-8")
-        return json.loads(s)
+        return fastjson.read(path)
     except Exception as e:
         log(f"safe_read_json failed for {path}: {e}")
         return None
@@ -56,7 +76,9 @@ def safe_read_json(path: Path):
 def sorted_node_list() -> List[Path]:
     """Return deterministic sorted list of node file paths."""
     try:
-        files = [p for p in NODES_DIR.iterdir() if p.is_file() and p.suffix == ".json"]
+        # scandir's DirEntry carries the file type, so no extra stat() per entry
+        with os.scandir(NODES_DIR) as it:
+            files = [Path(e.path) for e in it if e.name.endswith(".json") and e.is_file()]
         # sort by name to keep deterministic order
         files.sort(key=lambda p: p.name)
         return files
@@ -64,20 +86,217 @@ def sorted_node_list() -> List[Path]:
         log(f"sorted_node_list error: {e}")
         return []
 
+def read_node_files(files: List[Path]) -> List[Tuple[Path, dict]]:
+    """Read node files in parallel, keeping the input order."""
+    if len(files) < 2:
+        return [(p, safe_read_json(p)) for p in files]
+    with ThreadPoolExecutor(max_workers=min(READ_WORKERS, len(files))) as ex:
+        return list(zip(files, ex.map(safe_read_json, files)))
+
 def normalize_text(s: str) -> str:
-    # Minimal normalization: lowercase, collapse whitespace
-    return " ".join(s.replace("\r", " ").replace("\n", " ").split()).lower()
+    # Minimal normalization: lowercase, collapse whitespace.
+    # split() with no argument already breaks on \r, \n, \t and runs of them
+    return " ".join(s.split()).lower()
 
-def similarity(a: str, b: str) -> float:
-    """Stable similarity measure using SequenceMatcher ratio."""
-    try:
+def sequence_column(texts: List[str], j: int, sm: SequenceMatcher = None) -> List[Tuple[int, float]]:
+    """(i, ratio(texts[i], texts[j])) for every row i whose score reaches RELATIONS_MIN_SIM."""
+    sm = sm or SequenceMatcher(None, autojunk=True)
+    b = texts[j]
+    sm.set_seq2(b)
+    out = []
+    for i, a in enumerate(texts):
+        if i == j:
+            continue
         if not a or not b:
-            return 0.0
-        # SequenceMatcher is deterministic and in stdlib
-        return float(SequenceMatcher(None, a, b).ratio())
-    except Exception as e:
-        log(f"similarity error: {e}")
-        return 0.0
+            score = 0.0
+        elif a == b:
+            # ratio() of identical sequences is exactly 1.0; skip the matcher
+            score = 1.0
+        else:
+            sm.set_seq1(a)
+            if sm.real_quick_ratio() < RELATIONS_MIN_SIM or sm.quick_ratio() < RELATIONS_MIN_SIM:
+                continue
+            score = sm.ratio()
+        if score >= RELATIONS_MIN_SIM:
+            out.append((i, score))
+    return out
+
+_worker_texts: List[str] = []
+
+def _init_worker(texts: List[str]):
+    global _worker_texts
+    _worker_texts = texts
+
+def _column_task(j: int) -> List[Tuple[int, float]]:
+    return sequence_column(_worker_texts, j)
+
+class PackedRow:
+    """
+    Append-only {j: score} row kept as two arrays: 12 bytes per score
+    instead of a dict slot plus a float object. Supports the row[j] = score
+    and row.items() that the row consumers use.
+    """
+    __slots__ = ("cols", "scores")
+
+    def __init__(self):
+        self.cols = array("i")
+        self.scores = array("d")
+
+    def __setitem__(self, j: int, score: float):
+        self.cols.append(j)
+        self.scores.append(score)
+
+    def items(self):
+        return zip(self.cols, self.scores)
+
+def sequence_rows(texts: List[str]) -> List[PackedRow]:
+    """
+    SequenceMatcher ratio(texts[i], texts[j]) as one {j: score} PackedRow per i,
+    keeping only scores >= RELATIONS_MIN_SIM. ratio() is not symmetric, so
+    every ordered pair is scored. Columns are the unit of work so each text's
+    seq2 index (b2j) is built once instead of once per pair, and the cheap
+    upper bounds skip the full match for pairs that cannot reach the minimum.
+    Columns are spread over RELATIONS_WORKERS processes for larger corpora.
+
+    Trade-off: a row is complete only after the last column, so every kept
+    score is held at once, where scoring row by row held one row at a time.
+    At a low RELATIONS_MIN_SIM that is O(N^2) scores, so rows are PackedRows
+    rather than dicts to keep the constant small.
+    """
+    n = len(texts)
+    rows = [PackedRow() for _ in range(n)]
+    workers = min(RELATIONS_WORKERS, n)
+    if workers > 1 and n >= PARALLEL_MIN_NODES:
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(texts,)) as ex:
+                columns = ex.map(_column_task, range(n), chunksize=max(1, n // (4 * workers)))
+                # map() yields in column order, so rows fill exactly as in the serial loop
+                for j, column in enumerate(columns):
+                    for i, score in column:
+                        rows[i][j] = score
+            return rows
+        except Exception as e:
+            log(f"process pool failed ({e}); scoring serially")
+            rows = [PackedRow() for _ in range(n)]
+    sm = SequenceMatcher(None, autojunk=True)
+    for j in range(n):
+        for i, score in sequence_column(texts, j, sm):
+            rows[i][j] = score
+    return rows
+
+_TOKEN_RE = re.compile(r"\w+")
+
+def sparse_self_product(postings, n: int) -> List[dict]:
+    """
+    rows[i][j] = sum of w_i * w_j over the terms i and j share, i.e. X @ X.T
+    for a sparse document-term matrix given as term -> [(doc, weight)].
+    Only pairs that co-occur in some posting list are touched.
+    """
+    rows = [defaultdict(float) for _ in range(n)]
+    for plist in postings.values():
+        for a in range(len(plist)):
+            i, wi = plist[a]
+            row_i = rows[i]
+            for b in range(a + 1, len(plist)):
+                j, wj = plist[b]
+                row_i[j] += wi * wj
+    # mirror the upper triangle so each row sees all of its neighbours
+    for i in range(n):
+        for j, score in list(rows[i].items()):
+            if j > i:
+                rows[j][i] = score
+    return rows
+
+def tfidf_rows(texts: List[str]) -> List[dict]:
+    """
+    Cosine similarity of TF-IDF vectors as one {j: score} dict per row.
+    idf is smoothed as in scikit-learn's TfidfVectorizer,
+    log((1 + n) / (1 + df)) + 1, so a term found in every document still
+    counts and identical texts score 1.0.
+    """
+    n = len(texts)
+    tfs = [Counter(_TOKEN_RE.findall(t)) for t in texts]
+    df = Counter()
+    for tf in tfs:
+        df.update(tf.keys())
+    postings = defaultdict(list)
+    for i, tf in enumerate(tfs):
+        vec = {}
+        for term, count in tf.items():
+            vec[term] = count * (math.log((1 + n) / (1 + df[term])) + 1)
+        norm = math.sqrt(sum(w * w for w in vec.values()))
+        for term, w in vec.items():
+            postings[term].append((i, w / norm))
+    return sparse_self_product(postings, n)
+
+def jaccard_rows(texts: List[str]) -> List[dict]:
+    """
+    Jaccard similarity of token sets as one {j: score} dict per row:
+    intersections come from the boolean product M @ M.T, unions from
+    |A| + |B| - |A & B|.
+    """
+    n = len(texts)
+    token_sets = [frozenset(_TOKEN_RE.findall(t)) for t in texts]
+    postings = defaultdict(list)
+    for i, toks in enumerate(token_sets):
+        for term in toks:
+            postings[term].append((i, 1.0))
+    rows = sparse_self_product(postings, n)
+    for i, row in enumerate(rows):
+        size_i = len(token_sets[i])
+        for j, inter in row.items():
+            row[j] = inter / (size_i + len(token_sets[j]) - inter)
+    return rows
+
+def dedupe_rows(texts: List[str], rows_fn, same_score) -> List[dict]:
+    """
+    Run rows_fn on the distinct texts only, then fan each representative's
+    row back out to every copy. Copies of one text score same_score(text)
+    against each other; None or a score below RELATIONS_MIN_SIM stores
+    nothing, as the row functions do. Only valid for methods whose score
+    depends on nothing but the two texts.
+    """
+    index = {}
+    rep = [index.setdefault(t, len(index)) for t in texts]
+    if len(index) == len(texts):
+        return rows_fn(texts)
+    unique_rows = rows_fn(list(index))
+    members = [[] for _ in range(len(index))]
+    for i, u in enumerate(rep):
+        members[u].append(i)
+    rows = []
+    for i, u in enumerate(rep):
+        # a representative's row never holds its own group, so keys never repeat
+        row = PackedRow()
+        for v, score in unique_rows[u].items():
+            for j in members[v]:
+                row[j] = score
+        if len(members[u]) > 1:
+            score = same_score(texts[i])
+            # e.g. many empty-text nodes: don't store K^2 scores that cannot become edges
+            if score is not None and score >= RELATIONS_MIN_SIM:
+                for j in members[u]:
+                    if j != i:
+                        row[j] = score
+        rows.append(row)
+    return rows
+
+def sequence_method(texts: List[str]) -> List[dict]:
+    if RELATIONS_MAX_CHARS > 0:
+        texts = [t[:RELATIONS_MAX_CHARS] for t in texts]
+    return dedupe_rows(texts, sequence_rows, lambda t: 1.0 if t else 0.0)
+
+def jaccard_method(texts: List[str]) -> List[dict]:
+    return dedupe_rows(texts, jaccard_rows, lambda t: 1.0 if _TOKEN_RE.search(t) else None)
+
+# RELATIONS_METHOD -> row builder over normalized texts. Duplicate texts are
+# scored once except for tfidf, whose idf counts every copy.
+METHODS = {
+    "sequence": sequence_method,
+    "tfidf": tfidf_rows,
+    "jaccard": jaccard_method,
+}
 
 def compute_relations(nodes: List[Tuple[str, str]]) -> Tuple[List[dict], int]:
     """
@@ -90,53 +309,44 @@ def compute_relations(nodes: List[Tuple[str, str]]) -> Tuple[List[dict], int]:
     seen_pairs = set()
     # Pre-normalize texts
     norm_texts = [normalize_text(t) for (_, t) in nodes]
+    rows = METHODS[RELATIONS_METHOD](norm_texts)
 
+    ids = [nid for (nid, _) in nodes]
     for i in range(n):
-        id_i, _ = nodes[i]
+        id_i = ids[i]
+        # each row is read once; drop it so memory shrinks as edges are picked
+        row, rows[i] = rows[i], None
         sims = []
-        for j in range(n):
-            if i == j:
-                continue
-            id_j, _ = nodes[j]
-            pair = (min(id_i, id_j), max(id_i, id_j))
-            if pair in seen_pairs:
-                # skip duplicate computation for performance and determinism
-                continue
-            score = similarity(norm_texts[i], norm_texts[j])
-            sims.append((id_j, score, pair))
-        # pick top-k by score descending and above min similarity
-        sims.sort(key=lambda x: (-x[1], x[0]))
-        chosen = []
-        for id_j, score, pair in sims:
-            if score >= RELATIONS_MIN_SIM:
-                chosen.append((id_j, score, pair))
-            if len(chosen) >= RELATIONS_TOP_K:
-                break
-        for id_j, score, pair in chosen:
-            # add only if not already added by reverse
-            if pair in seen_pairs:
+        for j, score in row.items():
+            # unordered pair as one int (ids are unique, so indices identify the pair)
+            key = i * n + j if i < j else j * n + i
+            if key in seen_pairs or score < RELATIONS_MIN_SIM:
                 continue
-            seen_pairs.add(pair)
+            sims.append((ids[j], min(1.0, score), key))
+        # pick top-k by score descending; O(n log k) selection, same order as sorted()[:k]
+        chosen = heapq.nsmallest(RELATIONS_TOP_K, sims, key=lambda x: (-x[1], x[0]))
+        # candidates were already filtered against seen_pairs and ids are unique,
+        # so every chosen pair is new
+        for id_j, score, key in chosen:
+            seen_pairs.add(key)
             # pick deterministic direction: lexicographically smaller -> larger
-            source, target = pair
+            source, target = (id_i, id_j) if id_i < id_j else (id_j, id_i)
             edges.append({"source": source, "target": target, "score": round(float(score), 6)})
     return edges, len(edges)
 
-def atomic_write(path: Path, data: str):
+def atomic_write(path: Path, obj):
+    """Serialize obj straight to bytes (orjson when available) and swap it into place."""
     tmp = path.with_suffix(path.suffix + ".tmp")
-    tmp.write_text(data, encoding="utf-8")
+    tmp.write_bytes(fastjson.dumps(obj))
     tmp.replace(path)
 
-def file_checksum(path: Path) -> str:
-    try:
-        h = hashlib.sha256(path.read_bytes()).hexdigest()
-        return h
-    except Exception:
-        return ""
-
 def main():
     start = time.time()
     log("START relationer run")
+    if RELATIONS_METHOD not in METHODS:
+        # config error: fail before touching graph.json
+        log(f"Unknown RELATIONS_METHOD {RELATIONS_METHOD!r}; expected one of {', '.join(METHODS)}")
+        return 2
     try:
         node_files = sorted_node_list()
         if not node_files:
@@ -149,17 +359,22 @@ def main():
             g.setdefault("meta", {})
             g["meta"]["relations_generated_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
             g["meta"]["relations_count"] = 0
-            atomic_write(GRAPH_FILE, json.dumps(g, ensure_ascii=False, indent=2))
+            atomic_write(GRAPH_FILE, g)
             log("Wrote empty graph meta")
             return 0
 
         nodes = []
-        for p in node_files:
-            j = safe_read_json(p)
+        ids_seen = set()
+        for p, j in read_node_files(node_files):
             if not j:
                 log(f"Skipping unreadable node file {p}")
                 continue
             node_id = j.get("id") or p.stem
+            if node_id in ids_seen:
+                # ids must be unique so every (row, candidate) pair is distinct
+                log(f"Skipping duplicate node id {node_id} in {p}")
+                continue
+            ids_seen.add(node_id)
             text = j.get("text") or ""
             nodes.append((node_id, text))
         # if not enough nodes, write meta and exit
@@ -172,7 +387,7 @@ def main():
             g.setdefault("meta", {})
             g["meta"]["relations_generated_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
             g["meta"]["relations_count"] = 0
-            atomic_write(GRAPH_FILE, json.dumps(g, ensure_ascii=False, indent=2))
+            atomic_write(GRAPH_FILE, g)
             log("Wrote graph meta for small corpus")
             return 0
 
@@ -187,18 +402,20 @@ def main():
             "relations_count": int(count),
             "relations_top_k": int(RELATIONS_TOP_K),
             "relations_min_similarity": float(RELATIONS_MIN_SIM),
-            "relations_checksum": "",  # will fill after write
+            "relations_method": RELATIONS_METHOD,
+            # the prefix cap only applies to the sequence method
+            **({"relations_max_chars": int(RELATIONS_MAX_CHARS)} if RELATIONS_METHOD == "sequence" else {}),
+            "relations_checksum": "",  # filled from the serialized graph below
             "optimized": True
         }
         node_ids = [nid for (nid, _) in nodes]
         graph_obj = {"meta": meta, "nodes": node_ids, "edges": edges}
 
-        # atomic write graph
-        atomic_write(GRAPH_FILE, json.dumps(graph_obj, ensure_ascii=False, indent=2))
-        # compute checksum and update meta (atomic replace)
-        cs = file_checksum(GRAPH_FILE)
+        # checksum covers the graph as serialized with an empty checksum field;
+        # hashing the bytes in memory means graph.json is written only once
+        cs = hashlib.sha256(fastjson.dumps(graph_obj)).hexdigest()
         graph_obj["meta"]["relations_checksum"] = cs
-        atomic_write(GRAPH_FILE, json.dumps(graph_obj, ensure_ascii=False, indent=2))
+        atomic_write(GRAPH_FILE, graph_obj)
 
         duration = time.time() - start
         log(f"OK: wrote graph: {GRAPH_FILE} | nodes: {len(node_ids)} edges: {count} | dt={duration:.2f}s")
@@ -211,7 +428,7 @@ def main():
         try:
             g = {"meta": {"relations_generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
                           "relations_count": 0}, "nodes": [], "edges": []}
-            atomic_write(GRAPH_FILE, json.dumps(g, ensure_ascii=False, indent=2))
+            atomic_write(GRAPH_FILE, g)
             log("Wrote fallback partial graph.json after exception")
         except Exception as e2:
             log("Failed to write fallback graph.json: " + str(e2))
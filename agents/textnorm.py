@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+"""
+textnorm.py - shared title normalisation
+- NFKC folds compatibility forms (ligatures, full-width, etc.)
+- Lowercases, turns ASCII punctuation into spaces, collapses whitespace
+- Apostrophes are dropped instead, so "Don't" stays one word
+
+normalize_title("Phys. Review") == normalize_title("phys review") == "phys review"
+"""
+import string
+import unicodedata
+
+_PUNCT = {ord(c): " " for c in string.punctuation}
+_PUNCT.update({ord("'"): None, ord("’"): None})
+
+def normalize_title(text: str) -> str:
+    s = unicodedata.normalize("NFKC", text or "").lower().translate(_PUNCT)
+    return " ".join(s.split())